@@ -1,16 +1,23 @@
 import os
-from PIL import Image
+import argparse
 
 def convert_jpg_large_to_jpg(directory):
-    # Iterate through all files in the current directory
-    for filename in os.listdir(directory):
-        # Check if the file is a .jpg_large file
-        if filename.endswith('.jpg_large'):
-            # Construct the new filename by replacing .jpg_large with .jpg
-            new_filename = filename.replace('.jpg_large', '.jpg')
-            os.rename(filename, new_filename)
-            print(f'Renamed {filename} to {new_filename}')
+    # Iterate through all files in the directory
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            filename = entry.name
+            # Check if the file is a .jpg_large file
+            if not filename.endswith('.jpg_large'):
+                continue
+            # Construct the new path by stripping the trailing _large from the full path
+            src = entry.path
+            dst = src[:-len('_large')]
+            os.replace(src, dst)
+            print(f'Renamed {filename} to {os.path.basename(dst)}')
 
-# Specify the directory to scan for .jpg_large files, '.' means the current directory
-directory = '.'
-convert_jpg_large_to_jpg(directory)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Rename .jpg_large files to .jpg.')
+    # Specify the directory to scan for .jpg_large files, '.' means the current directory
+    parser.add_argument('directory', type=str, nargs='?', default='.', help='Directory to scan for .jpg_large files (default: current directory)')
+    args = parser.parse_args()
+    convert_jpg_large_to_jpg(args.directory)
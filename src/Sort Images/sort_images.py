@@ -3,121 +3,253 @@ import argparse
 import random
 import string
 import shutil
+import queue
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 import logging
+from logging.handlers import MemoryHandler, QueueHandler, QueueListener
 from elevate import elevate
 
+class DeferredQueueHandler(QueueHandler):
+    """Queues records unformatted so the listener thread does the string formatting."""
+    def prepare(self, record):
+        return record
+
 def setup_logging(log_to_file=False, log_level=logging.INFO):
-    """Sets up the logging configuration."""
+    """Sets up the logging configuration and returns the started QueueListener that writes the records."""
     log_format = '%(asctime)s - %(levelname)s - %(message)s'
     if log_to_file:
-        logging.basicConfig(filename='image_sorting.log', level=log_level, format=log_format)
+        file_handler = logging.FileHandler('image_sorting.log')
+        file_handler.setFormatter(logging.Formatter(log_format))
+        # Batch file writes; errors still flush immediately
+        handler = MemoryHandler(capacity=1000, flushLevel=logging.ERROR, target=file_handler)
     else:
-        logging.basicConfig(level=log_level, format=log_format)
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(log_format))
+    log_queue = queue.Queue(-1)
+    # force replaces handlers installed earlier, which would otherwise make basicConfig a no-op
+    logging.basicConfig(level=log_level, handlers=[DeferredQueueHandler(log_queue)], force=True)
     logging.getLogger().setLevel(log_level)  # Explicitly set the root logger level
+    listener = QueueListener(log_queue, handler)
+    listener.start()
+    return listener
+
+def stop_logging(listener):
+    """Stops the QueueListener after it drains queued records, then flushes and closes its handlers."""
+    listener.stop()
+    for handler in listener.handlers:
+        # MemoryHandler.close() flushes its buffer to the file first, then drops its target
+        target = handler.target if isinstance(handler, MemoryHandler) else None
+        handler.close()
+        if target is not None:
+            target.close()
+
+RANDOM_STRING_ALPHABET = string.ascii_lowercase + string.digits
 
 def get_random_string(length=8):
     """Generates a random string of specified length."""
-    letters = string.ascii_lowercase + string.digits
-    return ''.join(random.choice(letters) for i in range(length))
+    return ''.join(random.choices(RANDOM_STRING_ALPHABET, k=length))
+
+def compile_naming_convention(naming_convention):
+    """Returns a function building a new base name from an index and random string using naming_convention."""
+    pieces = list(string.Formatter().parse(naming_convention))
+    if any(spec or conversion or field not in (None, "index", "random") for _, field, spec, conversion in pieces):
+        # Format specs, conversions and unknown fields need the full str.format machinery
+        return lambda index, unique_id: naming_convention.format_map({"index": index, "random": unique_id})
+    parts = [(literal, field) for literal, field, _, _ in pieces]
+
+    def build_name(index, unique_id):
+        values = {"index": str(index), "random": unique_id, None: ""}
+        return "".join(literal + values[field] for literal, field in parts)
+    return build_name
 
 def create_backup_dir(backup_dir):
     """Creates a backup directory if it does not exist."""
-    if not os.path.exists(backup_dir):
-        os.makedirs(backup_dir)
-        logging.info(f"Backup directory created at {backup_dir}")
-
-def backup_file(file_path, backup_dir):
-    """Backs up a file to the specified backup directory."""
-    if os.path.exists(file_path):
-        backup_path = os.path.join(backup_dir, os.path.basename(file_path))
-        shutil.copy2(file_path, backup_path)
-        logging.info(f"Backed up {file_path} to {backup_path}")
-        return backup_path
-    return None
+    os.makedirs(backup_dir, exist_ok=True)
+    logging.info("Backup directory ready at %s", backup_dir)
+
+def link_or_copy(src, dst):
+    """Hard links src to dst when the filesystem allows it, otherwise copies it with metadata."""
+    try:
+        os.link(src, dst)
+    except FileExistsError:
+        # Unlink first so a stale hard link is replaced rather than written through
+        os.remove(dst)
+        link_or_copy(src, dst)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        # Cross-device links, FAT32/exFAT volumes (EINVAL on Windows) and other refusals all fall back to a copy
+        shutil.copy2(src, dst)
+
+def backup_file(file_path, backup_dir, hard_link=True):
+    """Backs up a file to the specified backup directory; hard_link=False always makes an independent copy."""
+    backup_path = os.path.join(backup_dir, os.path.basename(file_path))
+    try:
+        # Linking or copying a missing file raises on its own, so no exists() check beforehand
+        if hard_link:
+            link_or_copy(file_path, backup_path)
+        else:
+            # Remove first so copying never writes through an older hard-linked backup
+            try:
+                os.remove(backup_path)
+            except FileNotFoundError:
+                pass
+            shutil.copy2(file_path, backup_path)
+    except FileNotFoundError:
+        return None
+    logging.debug("Backed up %s to %s", file_path, backup_path)
+    return backup_path
 
 def rename_file(current_path, new_path, dry_run, verbose):
     """Renames a file from current_path to new_path."""
     try:
         if dry_run:
             if verbose:
-                logging.info(f"DRY RUN: Would rename {current_path} to {new_path}")
+                logging.info("DRY RUN: Would rename %s to %s", current_path, new_path)
         else:
-            if os.path.exists(new_path):
-                os.remove(new_path)
-            os.rename(current_path, new_path)
-            logging.info(f"Renamed {current_path} to {new_path}")
+            # os.replace overwrites atomically, so there is no exists/remove window before the rename
+            os.replace(current_path, new_path)
+            logging.debug("Renamed %s to %s", current_path, new_path)
+    except FileNotFoundError:
+        logging.error("Error renaming %s to %s: source file not found", current_path, new_path)
     except Exception as e:
-        logging.error(f"Error renaming {current_path} to {new_path}: {e}")
-
-def process_txt_files(base_name, new_base_name, backup_dir, current_dir, dry_run, verbose):
-    """Processes and renames associated .txt files."""
-    for txt_file in os.listdir(current_dir):
-        if txt_file.startswith(base_name) and txt_file.endswith('.txt'):
-            suffix = txt_file[len(base_name):]
-            current_txt_path = os.path.join(current_dir, txt_file)
-            new_txt_name = f"{new_base_name}{suffix}"
-            new_txt_path = os.path.join(current_dir, new_txt_name)
-            if os.path.exists(current_txt_path):
-                backup_file(current_txt_path, backup_dir)
-                rename_file(current_txt_path, new_txt_path, dry_run, verbose)
-
-def process_image(image, new_name, current_dir, backup_dir, overwrite, dry_run, verbose):
-    """Processes and renames an image file and its associated .txt files."""
-    current_path = os.path.join(current_dir, image)
+        logging.error("Error renaming %s to %s: %s", current_path, new_path, e)
+
+def index_txt_files(base_names, txt_entries):
+    """Maps each image base name to the .txt DirEntry objects whose longest matching base-name prefix it is."""
+    base_names = set(base_names)
+    txt_by_prefix = defaultdict(list)
+    for txt_entry in txt_entries:
+        name = txt_entry.name
+        # Longest prefix first, so "example2_prompt.txt" belongs to "example2" rather than "example"
+        for end in range(len(name) - len('.txt'), 0, -1):
+            if name[:end] in base_names:
+                txt_by_prefix[name[:end]].append(txt_entry)
+                break
+    return txt_by_prefix
+
+def process_txt_files(base_name, new_base_name, backup_dir, current_dir, dry_run, verbose, txt_entries=None):
+    """Processes and renames associated .txt files; txt_entries holds the DirEntry objects already matched to base_name."""
+    if txt_entries is None:
+        with os.scandir(current_dir) as entries:
+            txt_entries = [entry for entry in entries if entry.name.startswith(base_name) and entry.name.endswith('.txt')]
+    for txt_entry in txt_entries:
+        suffix = txt_entry.name[len(base_name):]
+        new_txt_path = os.path.join(current_dir, f"{new_base_name}{suffix}")
+        # Captions get edited in place after renaming, which would change a hard-linked backup too
+        backup_file(txt_entry.path, backup_dir, hard_link=False)
+        rename_file(txt_entry.path, new_txt_path, dry_run, verbose)
+
+def process_image(entry, new_name, current_dir, backup_dir, overwrite, dry_run, verbose, txt_entries=None, file_extension=None):
+    """Processes and renames an image DirEntry and its associated .txt files."""
+    current_path = entry.path
     new_path = os.path.join(current_dir, new_name)
-    base_name = os.path.splitext(image)[0]
-    new_base_name = os.path.splitext(new_name)[0]
     
-    process_txt_files(base_name, new_base_name, backup_dir, current_dir, dry_run, verbose)
+    # An empty txt_entries means the image has no sidecars, so skip the txt pass entirely
+    if txt_entries is None or txt_entries:
+        if file_extension is None:
+            file_extension = os.path.splitext(entry.name)[1]
+        # Both names end in the extension found by the scan, so slicing replaces os.path.splitext
+        base_name = entry.name[:len(entry.name) - len(file_extension)]
+        new_base_name = new_name[:len(new_name) - len(file_extension)]
+        process_txt_files(base_name, new_base_name, backup_dir, current_dir, dry_run, verbose, txt_entries)
     
-    if os.path.exists(new_path):
-        if overwrite:
-            backup_file(new_path, backup_dir)
-            rename_file(current_path, new_path, dry_run, verbose)
-        else:
-            logging.warning(f"Skipped {current_path} (already exists)")
+    if overwrite:
+        # backup_file skips a target that does not exist, so no separate existence check is needed
+        backup_file(new_path, backup_dir)
+        rename_file(current_path, new_path, dry_run, verbose)
+    elif os.path.exists(new_path):
+        logging.warning("Skipped %s (already exists)", current_path)
     else:
         rename_file(current_path, new_path, dry_run, verbose)
 
+def plan_has_collisions(plan):
+    """Returns True if a planned target name is also a planned source or the target of another rename."""
+    sources = set()
+    targets = []
+    for entry, new_name, txt_entries, file_extension in plan:
+        sources.add(entry.name)
+        targets.append(new_name)
+        base_name = entry.name[:len(entry.name) - len(file_extension)]
+        new_base_name = new_name[:len(new_name) - len(file_extension)]
+        for txt_entry in txt_entries:
+            sources.add(txt_entry.name)
+            targets.append(new_base_name + txt_entry.name[len(base_name):])
+    return len(set(targets)) != len(targets) or not sources.isdisjoint(targets)
+
 def validate_directory(directory):
     """Validates if the given directory path exists and is a directory."""
     if not os.path.isdir(directory):
-        logging.error(f"{directory} is not a valid directory")
+        logging.error("%s is not a valid directory", directory)
         raise NotADirectoryError(f"{directory} is not a valid directory")
 
-def confirm_backup(overwrite, num_files):
+def confirm_backup(overwrite, num_files, assume_yes=False):
     """Asks for user confirmation before proceeding with backup/overwrite if the number of files is large."""
-    if overwrite and num_files > 50:
+    if overwrite and num_files > 50 and not assume_yes:
         response = input(f"About to overwrite and backup {num_files} files. Do you want to proceed? (y/n): ")
         if response.lower() != 'y':
             logging.info("Operation cancelled by user.")
             exit()
 
-def rename_images(current_dir, overwrite=False, backup_dir=None, dry_run=False, verbose=False, naming_convention="{index}_{random}", file_extensions=['.jpg', '.png']):
+def rename_images(current_dir, overwrite=False, backup_dir=None, dry_run=False, verbose=False, naming_convention="{index}_{random}", file_extensions=['.jpg', '.png'], deterministic=False, assume_yes=False):
     """Renames image files in the current directory and handles their associated .txt files."""
     validate_directory(current_dir)
-    os.chdir(current_dir)
     
-    files = os.listdir(current_dir)
-    images = [file for file in files if any(file.endswith(ext) for ext in file_extensions)]
-    images.sort()
+    # DirEntry.is_file() answers from the cached dirent type, so directories such as "backup" are skipped without a stat
+    extensions = tuple(file_extensions)
+    images = []
+    txt_entries = []
+    with os.scandir(current_dir) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            if entry.name.endswith(extensions):
+                # Split once here; the planning loop reuses the base name and extension
+                images.append((entry, *os.path.splitext(entry.name)))
+            elif entry.name.endswith('.txt'):
+                txt_entries.append(entry)
+    if deterministic:
+        # Sorting is only needed for a reproducible index order; otherwise keep the directory order
+        images.sort(key=lambda image: image[0].name)
 
     if not images:
         logging.info("No matching image files found to rename.")
         return
     
-    if backup_dir is None:
-        backup_dir = os.path.join(current_dir, "backup")
+    # A relative backup_dir is resolved against current_dir, as it was when this function changed directory
+    backup_dir = os.path.join(current_dir, "backup" if backup_dir is None else backup_dir)
     create_backup_dir(backup_dir)
     
-    confirm_backup(overwrite, len(images))
+    # Confirm before any worker starts so the prompt never blocks the pool
+    confirm_backup(overwrite, len(images), assume_yes)
     
-    for i, image in enumerate(tqdm(images, desc="Processing Images", unit="image"), start=1):
-        file_extension = os.path.splitext(image)[1]
-        unique_id = get_random_string()
-        new_name = naming_convention.format(index=i, random=unique_id) + file_extension
-        process_image(image, new_name, current_dir, backup_dir, overwrite, dry_run, verbose)
+    # Plan every rename up front so each worker owns a disjoint set of files
+    build_name = compile_naming_convention(naming_convention)
+    needs_random = "{random" in naming_convention
+    txt_by_prefix = index_txt_files((base_name for _, base_name, _ in images), txt_entries) if txt_entries else {}
+    plan = []
+    for i, (entry, base_name, file_extension) in enumerate(images, start=1):
+        unique_id = get_random_string() if needs_random else ""
+        new_name = build_name(i, unique_id) + file_extension
+        # Pop so images sharing a base name (a.jpg, a.png) never claim the same sidecars; the first one planned keeps them
+        plan.append((entry, new_name, txt_by_prefix.pop(base_name, []), file_extension))
+
+    # Renames are bound by syscall latency rather than CPU, so oversubscribe the cores
+    max_workers = min(32, (os.cpu_count() or 1) * 4)
+    if plan_has_collisions(plan):
+        # Templates like "{index}" can rename onto another image's current name; the outcome then depends on
+        # the order, so a single worker runs the plan in submission order like a plain loop
+        logging.info("New names overlap existing names, renaming one file at a time")
+        max_workers = 1
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(process_image, entry, new_name, current_dir, backup_dir, overwrite, dry_run, verbose, image_txt_entries, file_extension)
+            for entry, new_name, image_txt_entries, file_extension in plan
+        ]
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Processing Images", unit="image"):
+            future.result()
 
 def main():
     elevate()  # Elevate to admin level privileges
@@ -130,26 +262,36 @@ def main():
     )
     parser.add_argument('directory', type=str, nargs='?', default=os.getcwd(), help='Directory containing the image files to rename (default: current directory)')
     parser.add_argument('--overwrite', action='store_true', help='Overwrite existing files')
-    parser.add_argument('--backup_dir', type=str, help='Directory to store backups', default=None)
+    parser.add_argument('--backup_dir', type=str, help='Directory to store backups; image backups are hard links when on the same drive, .txt backups are copies', default=None)
     parser.add_argument('--log_to_file', action='store_true', help='Log to a file instead of stdout')
     parser.add_argument('--dry_run', action='store_true', help='Perform a dry run without making changes')
-    parser.add_argument('--verbose', action='store_true', help='Enable verbose output')
+    parser.add_argument('--verbose', action='store_true', help='Enable verbose output (logs every backup and rename; implies --log_level DEBUG)')
     parser.add_argument('--log_level', type=str, choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'], default='INFO', help='Set the logging level')
     parser.add_argument('--naming_convention', type=str, default="{index}_{random}", help='Custom naming convention for new file names')
     parser.add_argument('--file_extensions', type=str, nargs='+', default=['.jpg', '.png'], help='File extensions to include in renaming process')
+    parser.add_argument('-y', '--yes', action='store_true', help='Skip the confirmation prompt for large overwrite batches')
+    parser.add_argument('--deterministic', action='store_true', help='Number images in sorted file name order instead of directory order')
     args = parser.parse_args()
     
     log_level = getattr(logging, args.log_level.upper(), logging.INFO)
-    setup_logging(log_to_file=args.log_to_file, log_level=log_level)
-    rename_images(
-        current_dir=args.directory, 
-        overwrite=args.overwrite, 
-        backup_dir=args.backup_dir, 
-        dry_run=args.dry_run, 
-        verbose=args.verbose, 
-        naming_convention=args.naming_convention, 
-        file_extensions=args.file_extensions
-    )
+    if args.verbose:
+        # Per-file backup and rename messages are logged at DEBUG
+        log_level = min(log_level, logging.DEBUG)
+    log_listener = setup_logging(log_to_file=args.log_to_file, log_level=log_level)
+    try:
+        rename_images(
+            current_dir=args.directory, 
+            overwrite=args.overwrite, 
+            backup_dir=args.backup_dir, 
+            dry_run=args.dry_run, 
+            verbose=args.verbose, 
+            naming_convention=args.naming_convention, 
+            file_extensions=args.file_extensions,
+            deterministic=args.deterministic,
+            assume_yes=args.yes
+        )
+    finally:
+        stop_logging(log_listener)  # Drains any queued records before exiting
 
 if __name__ == "__main__":
     main()
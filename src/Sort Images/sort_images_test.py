@@ -4,7 +4,10 @@ import shutil
 import tempfile
 import logging
 import re
-from sort_images import setup_logging, get_random_string, create_backup_dir, backup_file, rename_file, process_txt_files, process_image, rename_images
+import errno
+import time
+from unittest import mock
+from sort_images import DeferredQueueHandler, setup_logging, stop_logging, get_random_string, compile_naming_convention, create_backup_dir, backup_file, index_txt_files, plan_has_collisions, rename_file, process_txt_files, process_image, rename_images
 
 class TestImageRenaming(unittest.TestCase):
 
@@ -49,16 +52,65 @@ class TestImageRenaming(unittest.TestCase):
                 shutil.rmtree(file_path)
         os.chdir(self.current_dir)
 
+    def get_entries(self, predicate):
+        with os.scandir(self.test_dir) as entries:
+            return [entry for entry in entries if predicate(entry.name)]
+
     def test_get_random_string(self):
         random_string = get_random_string(8)
         self.assertEqual(len(random_string), 8)
         self.assertTrue(all(c.islower() or c.isdigit() for c in random_string))
 
+    def test_compile_naming_convention(self):
+        self.assertEqual(compile_naming_convention("{index}_{random}")(3, "abc"), "3_abc")
+        self.assertEqual(compile_naming_convention("img_{index}")(7, "abc"), "img_7")
+        self.assertEqual(compile_naming_convention("{index:04d}_{random}")(7, "abc"), "0007_abc")
+        self.assertEqual(compile_naming_convention("{{{index}}}")(7, "abc"), "{7}")
+
     def test_backup_file(self):
         backup_path = backup_file(self.image_file, self.backup_dir)
         self.assertIsNotNone(backup_path)
         self.assertTrue(os.path.exists(backup_path))
 
+    def test_backup_file_missing_source(self):
+        self.assertIsNone(backup_file("missing.jpg", self.backup_dir))
+
+    def test_backup_file_hard_links_on_same_filesystem(self):
+        backup_path = backup_file(self.image_file, self.backup_dir)
+        self.assertTrue(os.path.samefile(self.image_file, backup_path))
+
+    def test_backup_file_copies_across_devices(self):
+        with mock.patch("sort_images.os.link", side_effect=OSError(errno.EXDEV, "Invalid cross-device link")):
+            backup_path = backup_file(self.image_file, self.backup_dir)
+        self.assertFalse(os.path.samefile(self.image_file, backup_path))
+        with open(backup_path) as f:
+            self.assertEqual(f.read(), "dummy image data")
+
+    def test_backup_file_copies_when_filesystem_rejects_links(self):
+        with mock.patch("sort_images.os.link", side_effect=OSError(errno.EINVAL, "Invalid argument")):
+            backup_path = backup_file(self.image_file, self.backup_dir)
+        self.assertFalse(os.path.samefile(self.image_file, backup_path))
+        with open(backup_path) as f:
+            self.assertEqual(f.read(), "dummy image data")
+
+    def test_backup_file_replaces_existing_backup(self):
+        backup_file(self.image_file, self.backup_dir)
+        os.remove(self.image_file)
+        with open(self.image_file, 'w') as f:
+            f.write("new image data")
+        backup_path = backup_file(self.image_file, self.backup_dir)
+        with open(backup_path) as f:
+            self.assertEqual(f.read(), "new image data")
+
+    def test_process_txt_files_backs_up_independent_copies(self):
+        process_txt_files("example", "1_abc", self.backup_dir, self.test_dir, dry_run=False, verbose=False)
+        backup_path = os.path.join(self.backup_dir, "example_prompt.txt")
+        self.assertFalse(os.path.samefile("1_abc_prompt.txt", backup_path))
+        with open("1_abc_prompt.txt", 'w') as f:
+            f.write("edited caption")
+        with open(backup_path) as f:
+            self.assertEqual(f.read(), "dummy data for example_prompt.txt")
+
     def test_rename_file(self):
         new_name = "renamed_example.jpg"
         rename_file(self.image_file, new_name, dry_run=False, verbose=False)
@@ -91,10 +143,65 @@ class TestImageRenaming(unittest.TestCase):
         for file in original_files:
             self.assertFalse(os.path.exists(os.path.join(self.test_dir, file)))
 
+    def test_index_txt_files(self):
+        with open("unrelated.txt", 'w') as f:
+            f.write("dummy unrelated data")
+        txt_by_prefix = index_txt_files(["example", "example2"], self.get_entries(lambda name: name.endswith('.txt')))
+        self.assertEqual(sorted(e.name for e in txt_by_prefix["example"]), ["example_extra.txt", "example_extra_extra.txt", "example_negative.txt", "example_prompt.txt"])
+        self.assertEqual(sorted(e.name for e in txt_by_prefix["example2"]), ["example2_extra.txt", "example2_extra_extra.txt", "example2_negative.txt", "example2_prompt.txt"])
+        self.assertNotIn("unrelated", txt_by_prefix)
+
+    def test_rename_images_shared_base_name_claims_sidecars_once(self):
+        with open("example.png", 'w') as f:
+            f.write("dummy png data")
+        with self.assertNoLogs(level=logging.ERROR):
+            rename_images(self.test_dir, overwrite=False, backup_dir=self.backup_dir, dry_run=False, verbose=False, naming_convention="{index}", file_extensions=['.jpg', '.png'], deterministic=True)
+
+        # Sorted order puts example.jpg first, so it keeps the sidecars and example.png gets none
+        self.assertEqual(sorted(f for f in os.listdir(self.test_dir) if f.startswith("1")), ["1.jpg", "1_extra.txt", "1_extra_extra.txt", "1_negative.txt", "1_prompt.txt"])
+        self.assertFalse([f for f in os.listdir(self.test_dir) if f.startswith("2_")])
+        self.assertTrue(os.path.exists("2.png"))
+
+    def test_plan_has_collisions(self):
+        entries = {entry.name: entry for entry in self.get_entries(lambda name: name in ("example.jpg", "example2.png"))}
+        self.assertFalse(plan_has_collisions([(entries["example.jpg"], "1.jpg", [], ".jpg")]))
+        self.assertTrue(plan_has_collisions([(entries["example.jpg"], "1.jpg", [], ".jpg"), (entries["example2.png"], "example.jpg", [], ".png")]))
+
+    def test_rename_images_targets_overlapping_sources_keep_plan_order(self):
+        collide_dir = os.path.join(self.test_dir, "collide")
+        os.mkdir(collide_dir)
+        names = [f"{i}.jpg" for i in range(2, 10)] + ["a.jpg"]
+        for name in names:
+            with open(os.path.join(collide_dir, name), 'w') as f:
+                f.write(f"dummy data for {name}")
+
+        # Expected tree from renaming one file at a time in sorted order, skipping taken names
+        expected = {name: f"dummy data for {name}" for name in names}
+        for index, name in enumerate(sorted(names), start=1):
+            new_name = f"{index}.jpg"
+            if new_name not in expected:
+                expected[new_name] = expected.pop(name)
+
+        # Slow the existence check down so concurrent renames would reliably interleave with it
+        real_exists = os.path.exists
+        def slow_exists(path):
+            time.sleep(0.001)
+            return real_exists(path)
+        with mock.patch("sort_images.os.path.exists", side_effect=slow_exists):
+            rename_images(collide_dir, overwrite=False, backup_dir="backup", dry_run=False, verbose=False, naming_convention="{index}", file_extensions=['.jpg'], deterministic=True)
+
+        actual = {}
+        for name in os.listdir(collide_dir):
+            if name.endswith('.jpg'):
+                with open(os.path.join(collide_dir, name)) as f:
+                    actual[name] = f.read()
+        self.assertEqual(actual, expected)
+
     def test_process_image(self):
         unique_string = get_random_string(8)
         new_image_name = f"1_{unique_string}.jpg"
-        process_image(self.image_file, new_image_name, self.test_dir, self.backup_dir, overwrite=True, dry_run=False, verbose=False)
+        image_entry = self.get_entries(lambda name: name == self.image_file)[0]
+        process_image(image_entry, new_image_name, self.test_dir, self.backup_dir, overwrite=True, dry_run=False, verbose=False)
         self.assertTrue(os.path.exists(os.path.join(self.test_dir, new_image_name)))
         self.assertFalse(os.path.exists(os.path.join(self.test_dir, self.image_file)))
 
@@ -106,9 +213,20 @@ class TestImageRenaming(unittest.TestCase):
         self.assertFalse(image_files)
 
     def test_logging_levels(self):
-        setup_logging(log_to_file=True, log_level=logging.DEBUG)
+        listener = setup_logging(log_to_file=True, log_level=logging.DEBUG)
+        self.addCleanup(logging.getLogger().handlers.clear)
         logger = logging.getLogger()
         self.assertEqual(logger.level, logging.DEBUG)
+        self.assertTrue(any(isinstance(handler, DeferredQueueHandler) for handler in logger.handlers))
+        stop_logging(listener)
+
+    def test_logging_to_file_is_written_after_stop(self):
+        listener = setup_logging(log_to_file=True, log_level=logging.DEBUG)
+        self.addCleanup(logging.getLogger().handlers.clear)
+        logging.debug("Renamed %s to %s", "a.jpg", "1.jpg")
+        stop_logging(listener)
+        with open("image_sorting.log") as f:
+            self.assertIn("DEBUG - Renamed a.jpg to 1.jpg", f.read())
 
     def test_custom_naming_convention(self):
         rename_images(self.test_dir, overwrite=True, backup_dir=self.backup_dir, dry_run=False, verbose=False, naming_convention="{index}_{random}", file_extensions=['.jpg'])
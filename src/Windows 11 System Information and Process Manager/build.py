@@ -0,0 +1,33 @@
+import os
+import sys
+import shutil
+import subprocess
+
+# Paths used by the build; the DLL is optional and only bundled when it sits next to this script
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_SCRIPT = os.path.join(SCRIPT_DIR, "windows_11_sys_info_and_process_manager.py")
+OUTPUT_DIR = os.path.join(SCRIPT_DIR, "dist")
+DLL_NAME = "OpenHardwareMonitorLib.dll"
+
+# Function to compile the app into a single executable with Nuitka, so launches skip import bootstrapping
+def build():
+    command = [
+        sys.executable, "-m", "nuitka",
+        "--onefile",
+        "--windows-console-mode=disable",
+        "--enable-plugin=tk-inter",
+        f"--output-dir={OUTPUT_DIR}",
+        APP_SCRIPT,
+    ]
+    subprocess.run(command, check=True)
+
+    # The app looks for the DLL next to its executable before prompting for it
+    dll_path = os.path.join(SCRIPT_DIR, DLL_NAME)
+    if os.path.exists(dll_path):
+        shutil.copy2(dll_path, os.path.join(OUTPUT_DIR, DLL_NAME))
+        print(f"Bundled {DLL_NAME} into {OUTPUT_DIR}")
+    else:
+        print(f"{DLL_NAME} not found next to build.py; the app will prompt for it if WMI has no thermal zones")
+
+if __name__ == "__main__":
+    build()
@@ -1,14 +1,27 @@
 import os
 import sys
 import psutil
-import GPUtil
+import pynvml
 import platform
 import tkinter as tk
 from tkinter import messagebox, ttk, filedialog
 from datetime import datetime
 import ctypes
-import clr
 import json
+import atexit
+import functools
+import queue
+import threading
+import time
+try:
+    import orjson  # Optional faster JSON backend for config.json
+except ImportError:
+    orjson = None
+try:
+    import pythoncom
+    import wmi  # Reads ACPI thermal zones without loading OpenHardwareMonitor
+except ImportError:
+    wmi = None
 
 # Function to check if the script is running with administrative privileges
 def is_admin():
@@ -29,19 +42,33 @@ def elevate_privileges():
 # Load configuration from file
 def load_config():
     if os.path.exists("config.json"):
-        with open("config.json", "r") as file:
-            return json.load(file)
+        with open("config.json", "rb") as file:
+            data = file.read()
+        return orjson.loads(data) if orjson else json.loads(data)
     return {}
 
 # Save configuration to file
 def save_config(config):
-    with open("config.json", "w") as file:
-        json.dump(config, file)
+    if orjson:
+        with open("config.json", "wb") as file:
+            file.write(orjson.dumps(config))
+    else:
+        with open("config.json", "w", encoding="utf-8") as file:
+            json.dump(config, file, ensure_ascii=False, separators=(',', ':'))
+
+# Function to get the path to OpenHardwareMonitorLib.dll, preferring a copy shipped next to the executable;
+# an optional DLL is only taken from there or the saved path and returns None instead of prompting
+def get_dll_path(required=True):
+    # argv[0] is the one-file executable under Nuitka; sys.executable covers other frozen layouts
+    for folder in (os.path.dirname(os.path.abspath(sys.argv[0])), os.path.dirname(sys.executable)):
+        bundled_path = os.path.join(folder, "OpenHardwareMonitorLib.dll")
+        if os.path.exists(bundled_path):
+            return bundled_path
 
-# Function to get the path to OpenHardwareMonitorLib.dll
-def get_dll_path():
     config = load_config()
     dll_path = config.get("dll_path", "")
+    if not required and not os.path.exists(dll_path):
+        return None
     while not os.path.exists(dll_path):
         dll_path = filedialog.askopenfilename(
             title="Select OpenHardwareMonitorLib.dll",
@@ -55,24 +82,103 @@ def get_dll_path():
             sys.exit(1)
     return dll_path
 
-# Try to add the path to OpenHardwareMonitorLib.dll
-try:
-    dll_path = get_dll_path()
+# WMI connections are COM objects that cannot cross threads, so each thread opens its own once
+_wmi_local = threading.local()
+
+# Function to read the ACPI thermal zones through WMI in Celsius (empty when the BIOS exposes none)
+def read_thermal_zones():
+    connection = getattr(_wmi_local, "connection", None)
+    if connection is None:
+        pythoncom.CoInitialize()
+        connection = _wmi_local.connection = wmi.WMI(namespace="root\\wmi")
+    # CurrentTemperature is reported in tenths of a Kelvin
+    return [zone.CurrentTemperature / 10.0 - 273.15 for zone in connection.MSAcpi_ThermalZoneTemperature()]
+
+# Function to load OpenHardwareMonitorLib.dll once, returning (cpu_hardware, cpu_sensor, gpu_hardware, gpu_sensor)
+def open_hardware_monitor(required=True):
+    dll_path = get_dll_path(required)
+    if dll_path is None:
+        return None, None, None, None
+    import clr  # pythonnet is only needed for this fallback
     clr.AddReference(dll_path)
-    from OpenHardwareMonitor.Hardware import Computer
-except Exception as e:
-    messagebox.showerror("Error", f"Failed to load OpenHardwareMonitorLib.dll: {e}")
-    sys.exit(1)
+    from OpenHardwareMonitor.Hardware import Computer, SensorType
+    # Open the hardware monitor once; reopening it per refresh re-enumerates every device
+    computer = Computer()
+    computer.CPUEnabled = True
+    computer.GPUEnabled = True
+    computer.Open()
+    atexit.register(computer.Close)
+
+    # Find the first temperature sensor of a hardware device, returning (hardware, sensor)
+    def find_temperature_sensor(hardware_index):
+        if hardware_index >= len(computer.Hardware):
+            return None, None
+        hardware = computer.Hardware[hardware_index]
+        for sensor in hardware.Sensors:
+            # Enum comparison instead of stringifying and lowercasing each sensor identifier
+            if sensor.SensorType == SensorType.Temperature:
+                return hardware, sensor
+        return hardware, None
+
+    return find_temperature_sensor(0) + find_temperature_sensor(1)
+
+# Prefer WMI: MSAcpi_ThermalZoneTemperature needs neither the DLL nor the .NET bridge
+use_wmi = False
+if wmi is not None:
+    try:
+        use_wmi = bool(read_thermal_zones())  # Some OEM BIOSes expose no ACPI thermal zones
+    except Exception:
+        use_wmi = False
+
+# Query the first NVIDIA GPU through NVML directly instead of running nvidia-smi per refresh
+try:
+    pynvml.nvmlInit()
+    atexit.register(pynvml.nvmlShutdown)
+    nvml_handle = pynvml.nvmlDeviceGetHandleByIndex(0)
+    gpu_name = pynvml.nvmlDeviceGetName(nvml_handle)
+    if isinstance(gpu_name, bytes):  # Older NVML bindings return bytes
+        gpu_name = gpu_name.decode()
+except pynvml.NVMLError:
+    nvml_handle = None
+    gpu_name = None
+
+# Fall back to OpenHardwareMonitor when WMI cannot report the CPU temperature, or for AMD/Intel GPU
+# temperatures that NVML cannot read; sensors are resolved once
+cpu_hardware = cpu_temp_sensor = gpu_hardware = gpu_temp_sensor = None
+if not use_wmi or nvml_handle is None:
+    try:
+        # With WMI covering the CPU the DLL only adds the GPU temperature, so it is optional
+        cpu_hardware, cpu_temp_sensor, gpu_hardware, gpu_temp_sensor = open_hardware_monitor(required=not use_wmi)
+    except Exception as e:
+        if not use_wmi:
+            messagebox.showerror("Error", f"Failed to load OpenHardwareMonitorLib.dll: {e}")
+            sys.exit(1)
+
+# Attributes shown in the process Treeview; nothing else is collected per process
+PROCESS_ATTRS = ['pid', 'name', 'cpu_percent', 'memory_percent', 'username']
+# Columns whose backing attribute is only collected while the column is visible
+OPTIONAL_COLUMN_ATTRS = {"CPU %": 'cpu_percent', "Memory %": 'memory_percent'}
+
+# Process objects kept between refreshes so cpu_percent has a previous sample to diff against
+_proc_cache = {}
 
 # Function to scan processes and identify resource hogs
-def scan_processes():
+def scan_processes(attrs=PROCESS_ATTRS):
     processes = []
-    for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent', 'username']):
+    current_pids = set(psutil.pids())
+    # Forget processes that have exited since the last scan
+    for pid in _proc_cache.keys() - current_pids:
+        del _proc_cache[pid]
+    for pid in current_pids:
         try:
-            p_info = proc.info
-            processes.append(p_info)
+            proc = _proc_cache.get(pid)
+            if proc is None:
+                proc = _proc_cache[pid] = psutil.Process(pid)
+            # oneshot() reads the process status once and serves every attribute from it
+            with proc.oneshot():
+                processes.append(proc.as_dict(attrs=attrs))
         except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            pass
+            _proc_cache.pop(pid, None)
     return processes
 
 # Function to terminate a selected process
@@ -84,74 +190,131 @@ def terminate_process(pid):
     except Exception as e:
         messagebox.showerror("Error", f"Failed to terminate process {pid}. Reason: {str(e)}")
 
-# Function to get CPU and GPU temperature using OpenHardwareMonitor
+# Function to get CPU and GPU temperature from WMI or OpenHardwareMonitor (CPU) and NVML or OpenHardwareMonitor (GPU)
 def get_temperatures():
-    c = Computer()
-    c.CPUEnabled = True
-    c.GPUEnabled = True
-    c.Open()
-    
     cpu_temp = None
     gpu_temp = None
 
-    for i in range(0, len(c.Hardware[0].Sensors)):
-        if "temperature" in str(c.Hardware[0].Sensors[i].Identifier).lower():
-            cpu_temp = c.Hardware[0].Sensors[i].get_Value()
-            break
-
-    for i in range(0, len(c.Hardware[1].Sensors)):
-        if "temperature" in str(c.Hardware[1].Sensors[i].Identifier).lower():
-            gpu_temp = c.Hardware[1].Sensors[i].get_Value()
-            break
-
-    c.Close()
+    if use_wmi:
+        zones = read_thermal_zones()
+        if zones:
+            cpu_temp = max(zones)
+    elif cpu_temp_sensor is not None:
+        # Update() refreshes the readings of an already open device, which is far cheaper than reopening it
+        cpu_hardware.Update()
+        cpu_temp = cpu_temp_sensor.get_Value()
+
+    if nvml_handle is not None:
+        gpu_temp = float(pynvml.nvmlDeviceGetTemperature(nvml_handle, pynvml.NVML_TEMPERATURE_GPU))
+    elif gpu_temp_sensor is not None:
+        gpu_hardware.Update()
+        gpu_temp = gpu_temp_sensor.get_Value()
 
     return cpu_temp, gpu_temp
 
-# Function to get system information
-def get_system_info(self, metric=True):
-    cpu_usage = psutil.cpu_percent(interval=1)
+# Function to convert a batch of Celsius readings to Fahrenheit, passing through unavailable readings
+def celsius_to_fahrenheit(temps):
+    return [temp * 1.8 + 32 if isinstance(temp, float) else temp for temp in temps]
+
+# Function to format a batch of temperature readings with a unit suffix, marking unavailable readings
+def format_temperatures(temps, unit):
+    return [f"{temp:.1f}{unit}" if isinstance(temp, float) else "Unavailable" for temp in temps]
+
+# Values that cannot change while the app runs; platform.processor() is slow on Windows
+CPU_MODEL = platform.processor()
+BOOT_TIME_STR = datetime.fromtimestamp(psutil.boot_time()).strftime("%Y-%m-%d %H:%M:%S")
+# (batch temperature formatter, recommended CPU range, recommended GPU range) keyed by the metric flag;
+# the app picks one entry per unit toggle so refreshes never branch on the unit
+UNIT_FORMATS = {
+    True: (lambda temps: format_temperatures(temps, "°C"), "30-70°C", "30-85°C"),
+    False: (lambda temps: format_temperatures(celsius_to_fahrenheit(temps), "°F"), "86-158°F", "86-185°F"),
+}
+
+# Function to create the system information layout; keys are in display order and fixed values are filled once
+def create_info_template(resolution):
+    info = dict.fromkeys([
+        "CPU Usage (%)", "Memory Usage (%)", "Total Memory (GB)", "Available Memory (GB)",
+        "Boot Time", "Current Time", "Screen Resolution",
+        "CPU Temperature", "CPU Model", "Recommended CPU Temp Range", "GPU Temperature",
+    ], "")
+    info["Boot Time"] = BOOT_TIME_STR
+    info["Screen Resolution"] = resolution
+    info["CPU Model"] = CPU_MODEL
+    if nvml_handle is not None:
+        info.update(dict.fromkeys(["GPU Usage (%)", "GPU Memory Usage (%)", "GPU Model", "Recommended GPU Temp Range"], ""))
+        info["GPU Model"] = gpu_name
+    return info
+
+# Function to get system information, updating the app's info template in place
+def get_system_info(self):
+    # Non-blocking: utilization since the previous call, so the refresh cadence is the sampling window
+    cpu_usage = psutil.cpu_percent(interval=None)
     memory_info = psutil.virtual_memory()
-    gpu_info = GPUtil.getGPUs()[0] if GPUtil.getGPUs() else None
-    boot_time = datetime.fromtimestamp(psutil.boot_time()).strftime("%Y-%m-%d %H:%M:%S")
-    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    resolution = f"{self.winfo_screenwidth()}x{self.winfo_screenheight()}"
+    # The clock only shows seconds, so format it only when the second has changed
+    now = int(time.time())
+    if now != self.current_second:
+        self.current_second = now
+        self.current_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))
     
     # Fetch CPU and GPU temperatures
     cpu_temp, gpu_temp = get_temperatures()
 
-    if cpu_temp is None:
-        cpu_temp = "Unavailable"
-    if gpu_temp is None:
-        gpu_temp = "Unavailable"
-
-    if isinstance(cpu_temp, float) and not metric:
-        cpu_temp = cpu_temp * 9/5 + 32  # Convert to Fahrenheit
-    if isinstance(gpu_temp, float) and not metric:
-        gpu_temp = gpu_temp * 9/5 + 32  # Convert to Fahrenheit
-
-    info = {
-        "CPU Usage (%)": f"{cpu_usage}%",
-        "Memory Usage (%)": f"{memory_info.percent}%",
-        "Total Memory (GB)": f"{round(memory_info.total / (1024 ** 3), 2)} GB",
-        "Available Memory (GB)": f"{round(memory_info.available / (1024 ** 3), 2)} GB",
-        "Boot Time": boot_time,
-        "Current Time": current_time,
-        "Screen Resolution": resolution,
-        "CPU Temperature": f"{cpu_temp:.1f}°{'C' if metric else 'F'}" if isinstance(cpu_temp, float) else cpu_temp,
-        "CPU Model": platform.processor(),
-        "Recommended CPU Temp Range": f"30-70°C" if metric else "86-158°F",
-        "GPU Temperature": f"{gpu_temp:.1f}°{'C' if metric else 'F'}" if isinstance(gpu_temp, float) else gpu_temp,
-    }
-
-    if gpu_info:
-        info["GPU Usage (%)"] = f"{gpu_info.load * 100:.1f}%"
-        info["GPU Memory Usage (%)"] = f"{gpu_info.memoryUtil * 100:.1f}%"
-        info["GPU Model"] = gpu_info.name
-        info["Recommended GPU Temp Range"] = f"30-85°C" if metric else "86-185°F"
+    format_temps, cpu_temp_range, gpu_temp_range = self.unit_format
+
+    info = self.info_template
+    info["CPU Usage (%)"] = f"{cpu_usage}%"
+    info["Memory Usage (%)"] = f"{memory_info.percent}%"
+    info["Total Memory (GB)"] = f"{round(memory_info.total / (1024 ** 3), 2)} GB"
+    info["Available Memory (GB)"] = f"{round(memory_info.available / (1024 ** 3), 2)} GB"
+    info["Current Time"] = self.current_time
+    # Every reading goes through one batch call, so more sensors only lengthen the tuple
+    info["CPU Temperature"], info["GPU Temperature"] = format_temps((cpu_temp, gpu_temp))
+    info["Recommended CPU Temp Range"] = cpu_temp_range
+
+    if nvml_handle is not None:
+        gpu_utilization = pynvml.nvmlDeviceGetUtilizationRates(nvml_handle)
+        gpu_memory = pynvml.nvmlDeviceGetMemoryInfo(nvml_handle)
+        info["GPU Usage (%)"] = f"{gpu_utilization.gpu:.1f}%"
+        info["GPU Memory Usage (%)"] = f"{gpu_memory.used / gpu_memory.total * 100:.1f}%"
+        info["Recommended GPU Temp Range"] = gpu_temp_range
 
     return info
 
+# Service accounts whose processes are shown as system processes
+SYSTEM_USERS = frozenset({
+    'SYSTEM', 'NT AUTHORITY\\SYSTEM',
+    'LOCAL SERVICE', 'NT AUTHORITY\\LOCAL SERVICE',
+    'NETWORK SERVICE', 'NT AUTHORITY\\NETWORK SERVICE',
+})
+
+# Function to map a username to its row color tag; only a handful of distinct usernames exist, so cache them
+@functools.lru_cache(maxsize=None)
+def classify_username(username):
+    if username in SYSTEM_USERS:
+        return 'system'
+    elif username:
+        return 'user'
+    else:
+        return 'unknown'
+
+# Function to tell whether a process used no CPU and no memory; without both metrics it is never idle,
+# so a snapshot collected with a column hidden cannot drop rows
+def is_idle_process(proc):
+    metrics = [proc.get(attr) for attr in OPTIONAL_COLUMN_ATTRS.values()]
+    return all(metric is not None for metric in metrics) and not any(metrics)
+
+# Parsers turning row values back into numbers so numeric columns sort numerically instead of textually
+NUMERIC_COLUMN_PARSERS = {
+    "PID": int,
+    "CPU %": lambda value: float(value.rstrip('%')),
+    "Memory %": lambda value: float(value.rstrip('%')),
+}
+
+# Milliseconds between automatic refreshes of the system information and process list
+REFRESH_INTERVAL_MS = 1000
+# Milliseconds between checks of the main thread for new data from the collector thread
+DRAIN_INTERVAL_MS = 100
+
 # GUI for displaying processes and system information
 class ProcessMonitorApp(tk.Tk):
     def __init__(self):
@@ -160,6 +323,10 @@ class ProcessMonitorApp(tk.Tk):
         self.geometry("1280x720")
         self.configure(bg='#2e3f4f')
         self.metric = True  # Default to Metric system
+        self.show_idle = False  # Hide processes using no CPU or memory by default
+        self.unit_format = UNIT_FORMATS[self.metric]
+        self.current_second = None  # Second last formatted into current_time by the collector thread
+        self.current_time = ""
 
         # Center the window
         self.update_idletasks()
@@ -168,6 +335,8 @@ class ProcessMonitorApp(tk.Tk):
         x = (self.winfo_screenwidth() // 2) - (width // 2)
         y = (self.winfo_screenheight() // 2) - (height // 2)
         self.geometry(f'{width}x{height}+{x}+{y}')
+        # Read on the main thread; Tk calls are not safe from the collector thread
+        self.info_template = create_info_template(f"{self.winfo_screenwidth()}x{self.winfo_screenheight()}")
 
         # System Information Frame
         self.sys_info_frame = ttk.LabelFrame(self, text="System Information", padding=(10, 10))
@@ -191,6 +360,20 @@ class ProcessMonitorApp(tk.Tk):
         self.tree_scroll = ttk.Scrollbar(self.proc_frame, orient="vertical", command=self.tree.yview)
         self.tree_scroll.pack(side=tk.RIGHT, fill=tk.Y)
         self.tree.configure(yscrollcommand=self.tree_scroll.set)
+        self.row_values = {}  # PID -> (values, color tag) currently shown in the tree
+        self.sort_column = None  # Column last sorted by, reapplied after every refresh
+        self.sort_reverse = False
+        self.tree.tag_configure('system', background='#d3f9d8')
+        self.tree.tag_configure('user', background='#d3eaf9')
+        self.tree.tag_configure('unknown', background='#f9d3d3')
+
+        # Right-click a heading to choose the visible columns; hidden metric columns are not collected while idle processes are shown
+        self.process_attrs = PROCESS_ATTRS  # Read by the collector thread, so only ever replaced whole
+        self.column_visible = {col: tk.BooleanVar(value=True) for col in self.tree["columns"]}
+        self.column_menu = tk.Menu(self, tearoff=0)
+        for col in self.tree["columns"]:
+            self.column_menu.add_checkbutton(label=col, variable=self.column_visible[col], command=self.update_visible_columns)
+        self.tree.bind("<Button-3>", self.show_column_menu)
 
         self.terminate_button = tk.Button(self, text="Terminate Process", command=self.terminate_selected_process, bg='#ff4d4d', fg='#ffffff')
         self.terminate_button.pack(pady=10)
@@ -201,44 +384,123 @@ class ProcessMonitorApp(tk.Tk):
         self.unit_button = tk.Button(self, text="Toggle Units", command=self.toggle_units, bg='#2196F3', fg='#ffffff')
         self.unit_button.pack(pady=10)
 
+        self.idle_button = tk.Button(self, text="Show Idle Processes", command=self.toggle_idle, bg='#9e9e9e', fg='#ffffff')
+        self.idle_button.pack(pady=10)
+
         self.legend_button = tk.Button(self, text="Legend", command=self.show_legend, bg='#ffc107', fg='#ffffff')
         self.legend_button.pack(pady=10)
 
-        self.refresh_all()
+        # Prime psutil's CPU counters so the first non-blocking sample has a baseline
+        psutil.cpu_percent(interval=None)
+
+        # psutil, OpenHardwareMonitor and GPU queries run on a collector thread; widgets are only touched here
+        self.snapshots = queue.Queue()
+        self.refresh_requested = threading.Event()
+        self.collector = threading.Thread(target=self.collect_loop, daemon=True)
+        self.collector.start()
+        self.after(DRAIN_INTERVAL_MS, self.drain_queue)
+
+    def collect_loop(self):
+        while True:
+            # Clear before collecting so a request made mid-collection triggers another pass
+            self.refresh_requested.clear()
+            try:
+                sys_info = get_system_info(self)
+                # Render the text here; the template is reused, so only the finished string crosses threads
+                sys_info_text = "\n".join(f"{key}: {value}" for key, value in sys_info.items()) + "\n"
+                self.snapshots.put((sys_info_text, scan_processes(self.process_attrs)))
+            except Exception as e:
+                # A driver reset or WMI hiccup must not end the thread; show the error and retry next pass
+                self.snapshots.put((f"Failed to collect system information: {e}\n", None))
+            # Wake early when the user asks for a refresh
+            self.refresh_requested.wait(REFRESH_INTERVAL_MS / 1000)
+
+    def drain_queue(self):
+        latest = None
+        while True:
+            try:
+                latest = self.snapshots.get_nowait()
+            except queue.Empty:
+                break
+        if latest is not None:
+            sys_info_text, processes = latest
+            self.refresh_sys_info(sys_info_text)
+            # None marks a failed pass; the last process list stays until the next good one
+            if processes is not None:
+                self.refresh_process_list(processes)
+        self.after(DRAIN_INTERVAL_MS, self.drain_queue)
 
     def refresh_all(self):
-        self.refresh_sys_info()
-        self.refresh_process_list()
+        self.refresh_requested.set()
 
-    def refresh_sys_info(self):
+    def refresh_sys_info(self, text):
         self.sys_info_text.config(state=tk.NORMAL)
         self.sys_info_text.delete(1.0, tk.END)
-        sys_info = get_system_info(self, self.metric)
-        for key, value in sys_info.items():
-            self.sys_info_text.insert(tk.END, f"{key}: {value}\n")
+        self.sys_info_text.insert(tk.END, text)  # One Tcl call for the whole block
         self.sys_info_text.config(state=tk.DISABLED)
 
-    def refresh_process_list(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        processes = scan_processes()
-        for proc in processes:
-            color_tag = self.get_process_color(proc['username'])
-            self.tree.insert("", "end", values=(proc['pid'], proc['name'], f"{proc['cpu_percent']:.1f}%", f"{proc['memory_percent']:.1f}%", proc['username']), tags=(color_tag,))
-        self.tree.tag_configure('system', background='#d3f9d8')
-        self.tree.tag_configure('user', background='#d3eaf9')
-        self.tree.tag_configure('unknown', background='#f9d3d3')
+    def refresh_process_list(self, processes):
+        # Values are None when psutil was denied access to them and missing while their column is hidden
+        rows = [
+            (proc['pid'], proc['name'] or '', format(proc.get('cpu_percent') or 0.0, '.1f') + '%', format(proc.get('memory_percent') or 0.0, '.1f') + '%', proc['username'] or '')
+            for proc in processes
+            if self.show_idle or not is_idle_process(proc)
+        ]
+        new_rows = {values[0]: (values, self.get_process_color(values[4])) for values in rows}
+
+        # Rows use the PID as their iid, so only exited, changed and new processes cost a Tcl call
+        exited = [str(pid) for pid in self.row_values.keys() - new_rows.keys()]
+        if exited:
+            self.tree.delete(*exited)
+        for pid, (values, color_tag) in new_rows.items():
+            old_row = self.row_values.get(pid)
+            if old_row is None:
+                self.tree.insert("", "end", iid=str(pid), values=values, tags=(color_tag,))
+            elif old_row != (values, color_tag):
+                self.tree.item(str(pid), values=values, tags=(color_tag,))
+        self.row_values = new_rows
+        if self.sort_column is not None:
+            self.apply_sort()
+
+    def show_column_menu(self, event):
+        if self.tree.identify_region(event.x, event.y) == "heading":
+            self.column_menu.tk_popup(event.x_root, event.y_root)
+
+    def update_visible_columns(self):
+        visible = [col for col in self.tree["columns"] if self.column_visible[col].get()]
+        if not visible:
+            # The Treeview needs at least one column to stay usable
+            self.column_visible["PID"].set(True)
+            visible = ["PID"]
+        self.tree["displaycolumns"] = visible
+        self.update_process_attrs()
+
+    def update_process_attrs(self):
+        # The idle filter needs both metrics, so hidden metric columns are only skipped while it is off
+        if self.show_idle:
+            hidden_attrs = {attr for col, attr in OPTIONAL_COLUMN_ATTRS.items() if not self.column_visible[col].get()}
+        else:
+            hidden_attrs = set()
+        self.process_attrs = [attr for attr in PROCESS_ATTRS if attr not in hidden_attrs]
+        self.refresh_all()
 
     def terminate_selected_process(self):
         selected_item = self.tree.selection()
         if selected_item:
             pid = self.tree.item(selected_item[0], "values")[0]
             terminate_process(int(pid))
-            self.refresh_process_list()
+            self.refresh_all()
 
     def toggle_units(self):
         self.metric = not self.metric
-        self.refresh_sys_info()
+        # One attribute swap, so the collector thread never sees a half-switched unit
+        self.unit_format = UNIT_FORMATS[self.metric]
+        self.refresh_all()
+
+    def toggle_idle(self):
+        self.show_idle = not self.show_idle
+        self.idle_button.config(text="Hide Idle Processes" if self.show_idle else "Show Idle Processes")
+        self.update_process_attrs()
 
     def show_legend(self):
         legend_text = ("Legend:\n"
@@ -248,21 +510,39 @@ class ProcessMonitorApp(tk.Tk):
         messagebox.showinfo("Legend", legend_text)
 
     def sort_treeview(self, col, reverse):
-        l = [(self.tree.set(k, col), k) for k in self.tree.get_children('')]
-        l.sort(reverse=reverse)
-
-        for index, (val, k) in enumerate(l):
-            self.tree.move(k, '', index)
-
+        # Remember the sort so refresh_process_list can keep changed and new rows in order
+        self.sort_column = col
+        self.sort_reverse = reverse
+        self.apply_sort()
         self.tree.heading(col, command=lambda: self.sort_treeview(col, not reverse))
 
-    def get_process_color(self, username):
-        if username == 'SYSTEM' or 'NT AUTHORITY\SYSTEM' in username:
-            return 'system'
-        elif username:
-            return 'user'
+    def apply_sort(self):
+        # Sort the cached row values instead of reading every cell back from Tcl
+        index = self.tree["columns"].index(self.sort_column)
+        parse = NUMERIC_COLUMN_PARSERS.get(self.sort_column)
+        if parse:
+            # The key is computed once per row, not per comparison
+            key = lambda pid: parse(self.row_values[pid][0][index])
         else:
-            return 'unknown'
+            key = lambda pid: self.row_values[pid][0][index]
+        order = [str(pid) for pid in sorted(self.row_values, key=key, reverse=self.sort_reverse)]
+
+        # Walk the current order alongside the sorted one; a row that is already next in line needs no move,
+        # so a refresh where a few values changed only moves those rows
+        current = self.tree.get_children('')
+        placed = set()
+        next_index = 0
+        for position, iid in enumerate(order):
+            while next_index < len(current) and current[next_index] in placed:
+                next_index += 1
+            if next_index < len(current) and current[next_index] == iid:
+                next_index += 1
+            else:
+                self.tree.move(iid, '', position)
+            placed.add(iid)
+
+    def get_process_color(self, username):
+        return classify_username(username)
 
 if __name__ == "__main__":
     if sys.platform == "win32":